@@ -14,16 +14,351 @@
 # based upon the original L76GLNSS library
 # and the modifications by neuromystix
 # every lookup of coordinates or other GPS data has to wait for the
-# right GPS message, no caching of GPS data
+# right GPS message, the getters reuse a message for one second (the
+# L76 sends a new set every second), gps_message never uses the cache
 # MIT licence
 
-from machine import Timer
 import time
-import gc
-import binascii
+import micropython
+from array import array
 
 # TODO: annotate sattelites in view
 
+# set to 1 to also print every sentence read with debug=True, with 0 the
+# compiler leaves those prints out of the read loop altogether
+_DEBUG = const(0)
+_READ_SIZE = const(255)  # the L76 hands out up to 255 bytes per I2C read
+_BUF_SIZE = const(512)   # one read plus the unfinished sentence before it
+_RX_START = const(_BUF_SIZE - _READ_SIZE)  # where every read lands
+_CACHE_MS = const(1000)  # the L76 sends a new set of sentences every second
+_MAX_FIELDS = const(24)  # more than the longest sentence (GSV on a V4.10 chip)
+_IDLE_MS = const(20)     # pause when the L76 had nothing to send
+
+# the sentence types the getters parse, as small ints
+_ID_GGA = const(1)
+_ID_GLL = const(2)
+_ID_RMC = const(3)
+_ID_VTG = const(4)
+_IDS = {'GGA': _ID_GGA, 'GLL': _ID_GLL, 'RMC': _ID_RMC, 'VTG': _ID_VTG}
+
+# sentences that tell about the fix by their PositioningMode or FixStatus
+_PM_SENTENCES = frozenset(('RMC', 'GLL'))
+_FS_SENTENCES = frozenset(('GGA',))
+
+# the fixed PMTK commands, checksum included
+_PMTK_STANDBY = b'$PMTK161,0*28\r\n'
+_PMTK_HOT = b'$PMTK101*32\r\n'
+_PMTK_WARM = b'$PMTK102*31\r\n'
+_PMTK_COLD = b'$PMTK103*30\r\n'
+_PMTK_FULLCOLD = b'$PMTK104*37\r\n'
+_PMTK_ALWAYS_LOCATE = {8: b'$PMTK225,8*23\r\n', 9: b'$PMTK225,9*22\r\n'}
+
+# the keys of the hashes gps_message returns, one per field of the sentence
+_GGA_KW = ('NMEA', 'UTCTime', 'Latitude', 'NS', 'Longitude', 'EW',
+           'FixStatus', 'NumberOfSV', 'HDOP',
+           'Altitude', 'M', 'GeoIDSeparation', 'M', 'DGPSAge', 'DGPSStationID')
+_GLL_KW = ('NMEA', 'Latitude', 'NS', 'Longitude', 'EW',
+           'UTCTime', 'dataValid', 'PositioningMode')
+_RMC_KW = ('NMEA', 'UTCTime', 'dataValid', 'Latitude', 'NS', 'Longitude', 'EW',
+           'Speed', 'COG', 'Date', '', '', 'PositioningMode')
+_VTG_KW = ('NMEA', 'COG-T', 'T', 'COG-M', 'M', 'SpeedKnots', 'N', 'SpeedKm', 'K',
+           'PositioningMode')
+_GSA_KW = ('NMEA', 'Mode', 'FixStatus',
+           'SatelliteUsed01', 'SatelliteUsed02', 'SatelliteUsed03',
+           'SatelliteUsed04', 'SatelliteUsed05', 'SatelliteUsed06',
+           'SatelliteUsed07', 'SatelliteUsed08', 'SatelliteUsed09',
+           'SatelliteUsed10', 'SatelliteUsed11', 'SatelliteUsed12',
+           'PDOP', 'HDOP', 'VDOP')
+_GSV_KW = ('NMEA', 'NofMessage', 'SequenceNr', 'SatellitesInView',
+           'SatelliteID1', 'Elevation1', 'Azimuth1', 'SNR1',
+           'SatelliteID2', 'Elevation2', 'Azimuth2', 'SNR2',
+           'SatelliteID3', 'Elevation3', 'Azimuth3', 'SNR3',
+           'SatelliteID4', 'Elevation4', 'Azimuth4', 'SNR4')
+# V4.10 chips and later send one more field
+_RMC_KW_410 = _RMC_KW + ('NavigationaalStatus',)
+_GSA_KW_410 = _GSA_KW + ('GNSSSystemID',)
+_GSV_KW_410 = _GSV_KW + ('SignalID',)
+_PMTK705_KW = ('PMTK', 'ReleaseString', 'BuildID', 'ProductModel', 'SDK')
+_PMTK001_KW = ('PMTK', 'command', 'flag')
+_PQVERNO_KW = ('PMTK', 'command', 'ChipVersionID', 'date', 'time')
+
+
+@micropython.viper
+def _scan(buf: ptr8, start: int, end: int, char: int) -> int:
+    """index of the first char in buf[start:end], -1 if not found"""
+    i = start
+    while i < end:
+        if buf[i] == char:
+            return i
+        i += 1
+    return -1
+
+
+@micropython.viper
+def _rstrip_lf(buf: ptr8, start: int, end: int) -> int:
+    """end of buf[start:end] without the trailing \\n's"""
+    while end > start and buf[end - 1] == 0x0A:
+        end -= 1
+    return end
+
+
+@micropython.viper
+def _move(buf: ptr8, dst: int, src: int, n: int):
+    """copy n bytes from src to dst within buf, the two may overlap"""
+    if dst <= src:
+        i = 0
+        while i < n:
+            buf[dst + i] = buf[src + i]
+            i += 1
+    else:
+        i = n
+        while i > 0:
+            i -= 1
+            buf[dst + i] = buf[src + i]
+
+
+@micropython.viper
+def _nmea_xor(buf: ptr8, start: int, end: int) -> int:
+    """nmea checksum of buf[start:end], the xor of all the bytes"""
+    checksum = 0
+    i = start
+    while i < end:
+        checksum ^= buf[i]
+        i += 1
+    return checksum
+
+
+@micropython.viper
+def _hex(buf: ptr8, i: int) -> int:
+    """the two hex digits at buf[i] as an int, -1 if they aren't hex digits"""
+    value = 0
+    end = i + 2
+    while i < end:
+        c = buf[i]
+        if c >= 0x30 and c <= 0x39:  # 0-9
+            value = (value << 4) | (c - 0x30)
+        elif c >= 0x41 and c <= 0x46:  # A-F
+            value = (value << 4) | (c - 0x37)
+        elif c >= 0x61 and c <= 0x66:  # a-f
+            value = (value << 4) | (c - 0x57)
+        else:
+            return -1
+        i += 1
+    return value
+
+
+@micropython.viper
+def _sentence_id(buf: ptr8, i: int) -> int:
+    """the _ID_ of the sentence type at buf[i:i+3], 0 if the getters don't parse it"""
+    a = buf[i]
+    b = buf[i + 1]
+    c = buf[i + 2]
+    if a == 0x47:  # G
+        if b == 0x47 and c == 0x41:  # GGA
+            return _ID_GGA
+        if b == 0x4C and c == 0x4C:  # GLL
+            return _ID_GLL
+    elif a == 0x52 and b == 0x4D and c == 0x43:  # RMC
+        return _ID_RMC
+    elif a == 0x56 and b == 0x54 and c == 0x47:  # VTG
+        return _ID_VTG
+    return 0
+
+
+@micropython.viper
+def _next_comma(buf: ptr8, start: int, end: int) -> int:
+    """index of the first , in buf[start:end], end if there is none"""
+    i = start
+    while i < end:
+        if buf[i] == 0x2C:
+            return i
+        i += 1
+    return end
+
+
+@micropython.viper
+def _endswith(buf: ptr8, end: int, suffix: ptr8, n: int) -> int:
+    """1 if the n bytes of buf before end are those of suffix, else 0"""
+    # viper takes at most 4 arguments, the caller makes sure there are
+    # n bytes to compare
+    start = end - n
+    i = 0
+    while i < n:
+        if buf[start + i] != suffix[i]:
+            return 0
+        i += 1
+    return 1
+
+
+@micropython.native
+def _split(buf, start, star, bounds):
+    """bounds[k] and bounds[k+1] enclose field k of the sentence buf[start:star]"""
+    # missing fields are left empty, like _mixhash does
+    n = len(bounds)
+    bounds[0] = start
+    k = 1
+    i = start
+    while i < star and k < n:
+        i = _next_comma(buf, i + 1, star)
+        bounds[k] = i
+        k += 1
+    while k < n:
+        bounds[k] = star
+        k += 1
+
+
+@micropython.native
+def _field(mv, bounds, k):
+    """field k as a str"""
+    return str(mv[bounds[k] + 1:bounds[k + 1]], 'ascii')
+
+
+@micropython.native
+def _ascii_latlon(buf, a, b, hemisphere):
+    """the ddmm.mmmm or dddmm.mmmm in buf[a:b] as degrees, negative for S and W"""
+    # straight from the digits, no float() on a str and the whole degrees
+    # stay out of the float math, which keeps more precision on the MCU
+    dot = _scan(buf, a, b, 0x2E)  # .
+    if dot < 0:
+        dot = b
+    degrees = 0
+    i = a
+    while i < dot - 2:
+        degrees = degrees * 10 + buf[i] - 48
+        i += 1
+    minutes = (buf[dot - 2] - 48) * 10 + buf[dot - 1] - 48
+    fraction = 0
+    scale = 1
+    i = dot + 1
+    while i < b:
+        fraction = fraction * 10 + buf[i] - 48
+        scale *= 10
+        i += 1
+    sign = 1 - ((hemisphere == 0x53) | (hemisphere == 0x57)) * 2  # S or W
+    return sign * (degrees + (minutes + fraction / scale) / 60)
+
+
+@micropython.native
+def _coord_field(mv, bounds, k):
+    """field k and its N/S/E/W in field k+1 as degrees, None when empty"""
+    a = bounds[k] + 1
+    b = bounds[k + 1]
+    if b - a < 4:
+        return None
+    return _ascii_latlon(mv, a, b, mv[b + 1])
+
+
+@micropython.native
+def _ascii_number(buf, a, b):
+    """the decimal number in buf[a:b], float when there is a ., else int"""
+    sign = 1
+    if buf[a] == 0x2D:  # -
+        sign = -1
+        a += 1
+    value = 0
+    scale = 0
+    i = a
+    while i < b:
+        c = buf[i]
+        if c == 0x2E:  # .
+            scale = 1
+        else:
+            value = value * 10 + c - 48
+            scale *= 10
+        i += 1
+    if scale:
+        return sign * value / scale
+    return sign * value
+
+
+@micropython.native
+def _number_field(mv, bounds, k):
+    """field k as a number, None when empty"""
+    a = bounds[k] + 1
+    b = bounds[k + 1]
+    if b <= a:
+        return None
+    return _ascii_number(mv, a, b)
+
+
+@micropython.native
+def _float_field(mv, bounds, k):
+    """field k as a float, also when it has no ., None when empty"""
+    value = _number_field(mv, bounds, k)
+    if value is None:
+        return None
+    return float(value)
+
+
+@micropython.native
+def _convert_coord(coord, orientation):
+    """convert a ddmm.mmmm to dd.dddddd degrees"""
+    # the same digit by digit conversion the getters use, so the hash and
+    # the getters give the same degrees for the same sentence
+    coord = coord.encode()
+    if len(coord) < 4:
+        return None
+    return _ascii_latlon(coord, 0, len(coord), ord(orientation[0]) if orientation else 0)
+
+
+# the getters only need a few fields of a sentence, these parsers turn just
+# those into numbers (or str's for the times and modes) straight from the
+# receive buffer and return them as a tuple, UTCTime, Latitude and
+# Longitude always go first
+@micropython.native
+def _parse_GGA(mv, f):
+    """(UTCTime, Latitude, Longitude, FixStatus, HDOP, Altitude, GeoIDSeparation)"""
+    return (_field(mv, f, 1), _coord_field(mv, f, 2), _coord_field(mv, f, 4),
+            _number_field(mv, f, 6), _float_field(mv, f, 8),
+            _float_field(mv, f, 9), _float_field(mv, f, 11))
+
+
+@micropython.native
+def _parse_GLL(mv, f):
+    """(UTCTime, Latitude, Longitude, PositioningMode)"""
+    return (_field(mv, f, 5), _coord_field(mv, f, 1), _coord_field(mv, f, 3),
+            _field(mv, f, 7))
+
+
+@micropython.native
+def _parse_RMC(mv, f):
+    """(UTCTime, Latitude, Longitude, PositioningMode, Speed, COG, Date)"""
+    # a missing PositioningMode stays empty, as it does in the hash of _RMC
+    return (_field(mv, f, 1), _coord_field(mv, f, 3), _coord_field(mv, f, 5),
+            _field(mv, f, 12),
+            _float_field(mv, f, 7), _float_field(mv, f, 8), _field(mv, f, 9))
+
+
+@micropython.native
+def _parse_VTG(mv, f):
+    """(COG-T, SpeedKm)"""
+    return (_float_field(mv, f, 1), _float_field(mv, f, 7))
+
+
+def _message_fixed(nmea_message):
+    """does the hash of a sentence tell about a fix"""
+    if nmea_message['NMEA'][2:] in _PM_SENTENCES:  # 'VTG',
+        return nmea_message['PositioningMode'] != 'N'
+    if nmea_message['NMEA'][2:] in _FS_SENTENCES:  # 'GSA'
+        return nmea_message['FixStatus'].isdigit() and int(nmea_message['FixStatus']) >= 1
+    return False
+
+
+def _fields_fixed(sentence, fields):
+    """same for the getter fields of a GGA, GLL or RMC sentence"""
+    if sentence == _ID_GGA:
+        return fields[3] is not None and fields[3] >= 1
+    return fields[3] != 'N'
+
+
+def _no_decoder(gps, sentence):
+    """decoder for the sentences we don't know"""
+    return None
+
+
+# indexed by _ID_
+_PARSERS = (None, _parse_GGA, _parse_GLL, _parse_RMC, _parse_VTG)
+
 
 class L76GNSS:
 
@@ -39,15 +374,30 @@ class L76GNSS:
 
         self.timeout = timeout
         self.reg = bytearray(1)
+        self._buf = bytearray(_BUF_SIZE)
+        self._mv = memoryview(self._buf)
+        self._rx = self._mv[_RX_START:]
+        self._buf_pos = 0
+        self._buf_len = 0
+        self._scanned = 0
+        self._bounds = array('H', range(_MAX_FIELDS))
+        self._last = {}  # _ID_ -> (ticks_ms, fields) for the getters
         self.i2c.writeto(GPS_I2CADDR, self.reg)
         self.fix = False
         self.Latitude = None
         self.Longitude = None
         self.debug = debug
-        self.timeLastFix = 0
+        self.timeLastFix = None  # ticks_ms of the last fix
         self.ttf = -1
         self.lastmessage = {}
+        # (fixed, Latitude, Longitude) of the last sentence that tells
+        # about the fix, for fixed()
+        self._fixstate = None
         self.NMEAVersion = 301
+        # the keys of the sentences that got longer on V4.10 chips
+        self._kw_rmc = _RMC_KW
+        self._kw_gsa = _GSA_KW
+        self._kw_gsv = _GSV_KW
         self.ChipVersionID = None
         self.release = 1.0
         self.ReleaseString = None
@@ -59,115 +409,128 @@ class L76GNSS:
 
 
     def _read(self):
-        """read the data stream form the gps"""
-        # Changed from 64 to 128 - I2C L76 says it can read till 255 bytes
-        reg = b""
-        while len(set(reg)) < 10: # Throw away empty buffers
-            reg = self.i2c.readfrom(GPS_I2CADDR, 255)
-        return reg
-
-    @staticmethod
-    def _convert_coord(coord, orientation):
-        """convert a ddmm.mmmm to dd.dddddd degrees"""
-        coord = (float(coord) // 100) + ((float(coord) % 100) / 60)
-        if orientation == 'S' or orientation == 'W':
-            coord *= -1
-        return coord
+        """read the data stream form the gps into the receive buffer,
+        returns the number of bytes that came in"""
+        # every read lands in the same window at the end of the buffer, the
+        # unfinished sentence, if any, is moved right in front of it
+        n = self._buf_len - self._buf_pos
+        if n > _RX_START:
+            n = 0  # no sentence is that long, throw it away
+            self._scanned = 0
+        _move(self._buf, _RX_START - n, self._buf_pos, n)
+        self._buf_pos = _RX_START - n
+        self.i2c.readfrom_into(GPS_I2CADDR, self._rx)
+        # the L76 fills up with \n when it has nothing more to send,
+        # drop those so a sentence split over two reads stays in one piece
+        self._buf_len = _rstrip_lf(self._buf, _RX_START, _BUF_SIZE)
+        return self._buf_len - _RX_START
+
+    def _flush(self):
+        """forget what is left in the receive buffer, it may be old by now"""
+        self._buf_pos = self._buf_len
+        self._scanned = 0
+
+    def _next_sentence(self):
+        """start of the next complete $...*hh sentence in the receive buffer, -1 if none"""
+        # the sentence ends where _buf_pos is left, sentences with a
+        # wrong checksum are skipped
+        buf = self._buf
+        end = self._buf_len
+        while True:
+            start = _scan(buf, self._buf_pos, end, 0x24)  # $
+            if start < 0:
+                self._buf_pos = end
+                return -1
+            # the unfinished sentence left at _buf_pos by the previous call
+            # has its first _scanned bytes after the $ checked already
+            i = start + 1 + self._scanned
+            self._scanned = 0
+            star = _scan(buf, i, end, 0x2A)  # *
+            stop = star if star >= 0 else end
+            # a $ before the * means the previous sentence was cut short
+            restart = _scan(buf, i, stop, 0x24)
+            while restart >= 0:
+                start = restart
+                restart = _scan(buf, start + 1, stop, 0x24)
+            if star < 0 or star + 3 > end:
+                self._buf_pos = start
+                self._scanned = stop - start - 1
+                return -1
+            if _nmea_xor(buf, start + 1, star) == _hex(buf, star + 1):
+                self._buf_pos = star + 3
+                return start
+            # a sentence cut short right after its * takes the $ of the next
+            # one as checksum, so look again from just after this $
+            self._buf_pos = start + 1
+
+    _convert_coord = staticmethod(_convert_coord)
 
     def time_fixed(self):
-        """how long till the last fix"""
-        return int(time.ticks_ms()/1000) - self.timeLastFix
-
-    def _mixhash(self, keywords, sentence):
-        """return hash with keywords filled with sentence"""
-        ret = {}
-        while len(keywords) - len(sentence) > 0:
-            sentence += ('',)
-        if len(keywords) == len(sentence):
-            # for k, s in zip(keywords, sentence):
-            #     ret[k] = s
-            ret = dict(zip(keywords, sentence))
-            try:
-                ret['Latitude'] = self._convert_coord(ret['Latitude'], ret['NS'])
-            except:
-                pass
-            try:
-                ret['Longitude'] = self._convert_coord(ret['Longitude'], ret['EW'])
-            except:
-                pass
-            return ret
-        else:
+        """how long till the last fix, in seconds, None without a fix"""
+        if self.timeLastFix is None:
             return None
-
+        return time.ticks_diff(time.ticks_ms(), self.timeLastFix) // 1000
+
+    @micropython.native
+    def _mixhash(self, keywords, sentence, latitude=0):
+        """return hash with keywords filled with sentence, latitude is the
+        index of the Latitude field, 0 when the sentence has no coordinates"""
+        # missing fields are left empty, extra fields are dropped
+        missing = len(keywords) - len(sentence)
+        if missing > 0:
+            sentence.extend(('',) * missing)
+        ret = dict(zip(keywords, sentence))
+        if latitude:
+            # NS, Longitude and EW always follow Latitude
+            if sentence[latitude]:
+                ret['Latitude'] = self._convert_coord(sentence[latitude], sentence[latitude + 1])
+            if sentence[latitude + 2]:
+                ret['Longitude'] = self._convert_coord(sentence[latitude + 2], sentence[latitude + 3])
+        return ret
+
+    @micropython.native
     def _GGA(self, sentence):
         """essentials fix and accuracy data"""
-        keywords = ['NMEA', 'UTCTime', 'Latitude', 'NS', 'Longitude', 'EW',
-                    'FixStatus', 'NumberOfSV', 'HDOP',
-                    'Altitude', 'M', 'GeoIDSeparation', 'M', 'DGPSAge', 'DGPSStationID']
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(_GGA_KW, sentence, 2)
 
+    @micropython.native
     def _GLL(self, sentence):
         """GLL sentence (geolocation)"""
-        keywords = ['NMEA', 'Latitude', 'NS', 'Longitude', 'EW',
-                    'UTCTime', 'dataValid', 'PositioningMode']
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(_GLL_KW, sentence, 1)
 
+    @micropython.native
     def _RMC(self, sentence):
         """required minimum position data"""
         if len(sentence) == 11:
             sentence.append('N')
-        keywords = ['NMEA', 'UTCTime', 'dataValid', 'Latitude', 'NS', 'Longitude', 'EW',
-                    'Speed', 'COG', 'Date', '', '', 'PositioningMode']
-        # if len(sentence) > len(keywords):
-        if self.NMEAVersion >= NMEA410:
-            keywords.append('NavigationaalStatus')
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(self._kw_rmc, sentence, 3)
 
+    @micropython.native
     def _VTG(self, sentence):
         """track and ground speed"""
-        keywords = ['NMEA', 'COG-T', 'T', 'COG-M', 'M', 'SpeedKnots', 'N', 'SpeedKm', 'K',
-                    'PositioningMode']
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(_VTG_KW, sentence)
 
+    @micropython.native
     def _GSA(self, sentence):
         """fix state, the sattelites used and DOP info"""
-        keywords = ['NMEA', 'Mode', 'FixStatus',
-                    'SatelliteUsed01', 'SatelliteUsed02', 'SatelliteUsed03',
-                    'SatelliteUsed04', 'SatelliteUsed05', 'SatelliteUsed06',
-                    'SatelliteUsed07', 'SatelliteUsed08', 'SatelliteUsed09',
-                    'SatelliteUsed10', 'SatelliteUsed11', 'SatelliteUsed12',
-                    'PDOP', 'HDOP', 'VDOP']
-        # if len(sentence) > len(keywords):
-        if self.NMEAVersion >= NMEA410:
-            keywords.append('GNSSSystemID')
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(self._kw_gsa, sentence)
 
+    @micropython.native
     def _GSV(self, sentence):
         """four of the sattelites seen"""
-        keywords = ['NMEA', 'NofMessage', 'SequenceNr', 'SatellitesInView',
-                    'SatelliteID1', 'Elevation1', 'Azimuth1', 'SNR1',
-                    'SatelliteID2', 'Elevation2', 'Azimuth2', 'SNR2',
-                    'SatelliteID3', 'Elevation3', 'Azimuth3', 'SNR3',
-                    'SatelliteID4', 'Elevation4', 'Azimuth4', 'SNR4']
-        # if len(sentence) > len(keywords):
-        if self.NMEAVersion >= NMEA410:
-            keywords.append('SignalID')
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(self._kw_gsv, sentence)
 
     def _pmtk_dt_release(self, sentence):
         """convert the release information from the message"""
-        keywords = ['PMTK','ReleaseString', 'BuildID','ProductModel','SDK']
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(_PMTK705_KW, sentence)
 
     def _pmtkAck(self, sentence):
         """convert the ack message"""
-        keywords = ['PMTK', 'command', 'flag']
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(_PMTK001_KW, sentence)
 
     def _pqverno(self, sentence):
         """convert the version message"""
-        keywords = ['PMTK', 'command', 'ChipVersionID','date','time']
-        return self._mixhash(keywords, sentence)
+        return self._mixhash(_PQVERNO_KW, sentence)
 
     def _pmtk(self, sentence, debug=False):
         """convert the anonymous pmtk message"""
@@ -175,6 +538,7 @@ class L76GNSS:
             print(sentence[0])
         return dict(PMTK=sentence[0], msg=sentence)
 
+    @micropython.native
     def _decodeNMEA(self, nmea, debug=False):
         """turns a message into a hash"""
         nmea_sentence = nmea[:-3].split(',')
@@ -183,100 +547,122 @@ class L76GNSS:
         nmea_sentence[0] = sentence
         if debug:
             print(sentence, "->", nmea_sentence)
-        if sentence.endswith('RMC'):
-            return self._RMC(nmea_sentence)
-        if sentence.endswith('VTG'):
-            return self._VTG(nmea_sentence)
-        if sentence.endswith('GGA'):
-            return self._GGA(nmea_sentence)
-        if sentence.endswith('GSA'):
-            return self._GSA(nmea_sentence)
-        if sentence.endswith('GSV'):
-            return self._GSV(nmea_sentence)
-        if sentence.endswith('GLL'):
-            return self._GLL(nmea_sentence)
-        if sentence == 'PMTK705':
-            return self._pmtk_dt_release(nmea_sentence)
-        if sentence == 'PMTKLOG':
-            return self._pmtk(nmea_sentence)
-        if sentence == 'PMTK001':
-            return self._pmtkAck(nmea_sentence)
-        if sentence == 'PQVERNO':
-            return self._pqverno(nmea_sentence)
-        # if sentence.startswith('PMTK'):
-        #     return self._pmtk(nmea_sentence)
-        return None
+        decoder = self._EXACT.get(sentence) or self._HANDLERS.get(sentence[-3:], _no_decoder)
+        return decoder(self, nmea_sentence)
 
-    def _read_message(self, messagetype=('GLL',), timeout=None, debug=False):
-        """read and decode a nmea sentence according to a messagetype"""
-        # Sometimes messagetupe is a string.  Sometimes a tuple.
+    def _find_sentence(self, messagetype=('GLL',), timeout=None, debug=False):
+        """read until a nmea sentence according to a messagetype comes by,
+        return where it starts in the receive buffer, -1 on timeout"""
+        # Sometimes messagetupe is a string.  Sometimes a tuple (or a list).
         # Make it always a tuple
-        if not isinstance(messagetype, tuple):
+        if not isinstance(messagetype, (tuple, list, frozenset)):
                 messagetype = (messagetype,)
         if debug:
             print("messagetype", messagetype)
+        wanted = [m.encode() for m in messagetype]
         messagefound = False
         if timeout is None:
             timeout = self.timeout
-        chrono = Timer.Chrono()
-        chrono.reset()
-        chrono.start()
-        chrono_running = True
-        while not messagefound and chrono_running:
-            if debug:
+        timeout *= 1000
+        # look the methods up once, not on every pass of the loop
+        next_sentence = self._next_sentence
+        read = self._read
+        buf = self._buf
+        sleep_ms = time.sleep_ms
+        ticks_ms = time.ticks_ms
+        ticks_diff = time.ticks_diff
+        started = ticks_ms()
+        while not messagefound:
+            if _DEBUG and debug:
                 print("--Checking Mesages--")
                 print("Wanted messagetype(s)", messagetype)
-            nmea_buffer = self._read().decode('utf-8')
-            # Is messagetype present in the data
-            for m in messagetype:
-                if messagefound:
-                    break
-                if nmea_buffer.find(m):
-                    # break apart the long string into segments
-                    # NMEA messages end with \r\n
-                    for segment in nmea_buffer.split("\r\n"):
-                        if messagefound:
-                            break
-                        if debug:
-                            print("segment", segment)
-                        # Does this segment contain the message we're looking for?
-                        if segment.find(m) > 0:
-                            # Validate the whole message is present in segment
-                            if segment.startswith("$") and segment[len(segment)-3:len(segment)-2] == "*":
-                                # We now have what we want
-                                # Decode segment
-                                nmea_message = self._decodeNMEA(segment)
-                                if debug:
-                                    print("Decoded nmea_message", nmea_message)
-                                self.lastmessage = nmea_message
-                                messagefound = True
-            if debug:
+            start = next_sentence()
+            if start < 0:
+                if not read():
+                    # nothing but \n's, give the L76 some time instead
+                    # of polling the I2C bus flat out
+                    sleep_ms(_IDLE_MS)
+            else:
+                end = self._buf_pos
+                if _DEBUG and debug:
+                    print("segment", str(self._mv[start:end], 'ascii'))
+                # compare the sentence id in place, the sentences we don't
+                # want are never turned into a str
+                comma = _next_comma(buf, start, end)
+                for m in wanted:
+                    # Is this the message we're looking for?
+                    n = len(m)
+                    if comma - start > n and _endswith(buf, comma, m, n):
+                        messagefound = True
+                        break
+            if _DEBUG and debug:
                 print("found message?", messagefound)
-            if chrono.read() > timeout or messagefound:
-                chrono.stop()
-                chrono_running = False
+            if ticks_diff(ticks_ms(), started) > timeout:
+                break
         if messagefound:
-            return nmea_message
+            return start
         else:
+            return -1
+
+    def _read_message(self, messagetype=('GLL',), timeout=None, debug=False):
+        """read and decode a nmea sentence according to a messagetype"""
+        start = self._find_sentence(messagetype, timeout=timeout, debug=debug)
+        if start < 0:
             return None
+        nmea_message = self._decodeNMEA(str(self._mv[start:self._buf_pos], 'ascii'))
+        if debug:
+            print("Decoded nmea_message", nmea_message)
+        self.lastmessage = nmea_message
+        if nmea_message and 'NMEA' in nmea_message:
+            if _message_fixed(nmea_message):
+                self._fixstate = (True, nmea_message['Latitude'], nmea_message['Longitude'])
+            else:
+                self._fixstate = (False, None, None)
+        else:
+            self._fixstate = None
+        return nmea_message
+
+    def _read_fields(self, messagetype, debug=False):
+        """read a nmea sentence according to a messagetype (a tuple), return the getter fields"""
+        # lastmessage is left alone, that is the full hash of gps_message and
+        # get_fix, but fixed() does follow the sentences read here
+        now = time.ticks_ms()
+        for m in messagetype:
+            last = self._last.get(_IDS.get(m))
+            if last is not None and time.ticks_diff(now, last[0]) < _CACHE_MS:
+                if debug:
+                    print("cached", m, last[1])
+                return last[1]
+        self._flush()
+        start = self._find_sentence(messagetype, debug=debug)
+        if start < 0:
+            return None
+        sentence = _sentence_id(self._buf, start + 3)
+        if not sentence:
+            return None
+        _split(self._buf, start, self._buf_pos - 3, self._bounds)
+        fields = _PARSERS[sentence](self._mv, self._bounds)
+        # the buffer was flushed at now, so the sentence came off the bus
+        # after that, never count it younger than it can be
+        self._last[sentence] = (now, fields)
+        if sentence != _ID_VTG:
+            if _fields_fixed(sentence, fields):
+                self._fixstate = (True, fields[1], fields[2])
+            else:
+                self._fixstate = (False, None, None)
+        return fields
 
     def fixed(self):
-        """fixed yet? returns true or false"""
-        nmea_message = self.lastmessage
-        pm = fs = False
-        if nmea_message != {}:
-            if nmea_message['NMEA'][2:] in ('RMC', 'GLL'):  # 'VTG',
-                pm = nmea_message['PositioningMode'] != 'N'
-            if nmea_message['NMEA'][2:] in ('GGA',):  # 'GSA'
-                fs = int(nmea_message['FixStatus']) >= 1
-        if pm or fs:
+        """fixed yet? returns true or false, according to the last sentence read"""
+        state = self._fixstate
+        if state is not None and state[0]:
             self.fix = True
-            self.timeLastFix = int(time.ticks_ms() / 1000)
-            self.Latitude = nmea_message['Latitude']
-            self.Longitude = nmea_message['Longitude']
+            self.timeLastFix = time.ticks_ms()
+            self.Latitude = state[1]
+            self.Longitude = state[2]
         else:
             self.fix = False
-            self.timeLastFix = 0xffffffff
+            self.timeLastFix = None
             self.Latitude = None
             self.Longitude = None
             self.ttf = -1
@@ -286,69 +672,60 @@ class L76GNSS:
         """look for a fix, use force to refix, returns true or false"""
         if force:
             self.fix = False
+            self._last.clear()
         if timeout is None:
             timeout = self.timeout
-        chrono = Timer.Chrono()
-        chrono.reset()
-        chrono.start()
-        chrono_running = True
+        timeout *= 1000
+        started = time.ticks_ms()
+        elapsed = 0
+        self._flush()
 
-        while chrono_running and not self.fix:
-            nmea_message = self._read_message(('RMC', 'VTG', 'GLL', 'GGA', 'GSA'), debug=debug)
+        while elapsed <= timeout and not self.fix:
+            nmea_message = self._read_message(('RMC', 'GLL', 'GGA'), debug=debug)
             if nmea_message is not None:
-                pm = fs = False
-                try:
-                    if nmea_message['NMEA'][2:] in ('RMC', 'GLL'):  #'VTG',
-                        pm = nmea_message['PositioningMode'] != 'N'
-                    if nmea_message['NMEA'][2:] in ('GGA', ):  #'GSA'
-                        fs = int(nmea_message['FixStatus']) >= 1
-                    if pm or fs:
-                        chrono.stop()
-                        self.fix = True
-                        self.timeLastFix = int(time.ticks_ms() / 1000) - self.timeLastFix
-                        self.ttf = round(chrono.read())
-                        self.Latitude = nmea_message['Latitude']
-                        self.Longitude = nmea_message['Longitude']
-                except:
-                    pass
-            if chrono.read() > timeout:
-                chrono_running = False
-        chrono.stop()
+                if _message_fixed(nmea_message):
+                    self.fix = True
+                    self.timeLastFix = time.ticks_ms()
+                    self.ttf = (time.ticks_diff(self.timeLastFix, started) + 500) // 1000
+                    self.Latitude = nmea_message['Latitude']
+                    self.Longitude = nmea_message['Longitude']
+            elapsed = time.ticks_diff(time.ticks_ms(), started)
         if debug:
-            print("fix in", chrono.read(), "seconds")
+            print("fix in", elapsed / 1000, "seconds")
         return self.fix
 
     def gps_message(self, messagetype=None, debug=False):
         """returns the last message from the L76 gps"""
+        self._flush()
         return self._read_message(messagetype=messagetype, debug=debug)
 
     def coordinates(self, debug=False):
         """you are here"""
         msg, latitude, longitude = None, None, None
-        if not self.fix:
-            self.get_fix(debug=debug)
-        msg = self._read_message(('RMC', 'GGA', 'GLL'), debug=debug)
+        if (not self.fix and self.get_fix(debug=debug)
+                and self.Latitude is not None and self.Latitude != ''):
+            # the sentence that gave the fix has the coordinates already
+            return dict(latitude=self.Latitude, longitude=self.Longitude, ttf=self.ttf)
+        msg = self._read_fields(('RMC', 'GGA', 'GLL'), debug=debug)
         if msg is not None:
-            self.Latitude = msg['Latitude']
-            self.Longitude = msg['Longitude']
+            self.Latitude = msg[1]
+            self.Longitude = msg[2]
         return dict(latitude=self.Latitude, longitude=self.Longitude, ttf=self.ttf)
 
     def get_speed_RMC(self):
         """returns your speed and direction as return by the ..RMC message"""
         msg, speed, COG = None, None, None
-        msg = self._read_message(messagetype='RMC')
+        msg = self._read_fields(('RMC',))
         if msg is not None:
-            speed = msg['Speed']
-            COG = msg['COG']
+            utc_time, latitude, longitude, mode, speed, COG, utc_date = msg
         return dict(speed=speed, COG=COG)
 
     def get_speed(self):
         """returns your speed and direction in degrees"""
         msg, speed, COG = None, None, None
-        msg = self._read_message(messagetype='VTG')
+        msg = self._read_fields(('VTG',))
         if msg is not None:
-            speed = msg['SpeedKm']
-            COG = msg['COG-T']
+            COG, speed = msg
         return dict(speed=speed, COG=COG)
 
     def get_location(self, MSL=False,debug=False):
@@ -356,32 +733,27 @@ class L76GNSS:
         msg, latitude, longitude, HDOP, altitude = None, None, None, None, None
         if not self.fix:
             self.get_fix(debug=debug)
-        msg = self._read_message(messagetype='GGA')
+        msg = self._read_fields(('GGA',))
         if msg is not None:
-            latitude = msg['Latitude']
-            longitude = msg['Longitude']
-            HDOP = msg['HDOP']
+            utc_time, latitude, longitude, fix, HDOP, altitude, geoid = msg
             if MSL:
-                altitude = msg['GeoIDSeparation']
-            else:
-                altitude = msg['Altitude']
+                altitude = geoid
         return dict(latitude=latitude, longitude=longitude, HDOP=HDOP, altitude=altitude, ttf=self.ttf)
 
     def getUTCTime(self, debug=False):
         """return UTC time or None when nothing if found"""
-        msg = self._read_message(('GLL','RMC','GGA'), debug=debug)
+        msg = self._read_fields(('GLL','RMC','GGA'), debug=debug)
         if msg is not None:
-            utc_time = msg['UTCTime']
+            utc_time = msg[0]
             return "{}:{}:{}".format(utc_time[0:2], utc_time[2:4], utc_time[4:6])
         else:
             return None
 
     def getUTCDateTime(self, debug=False):
         """return UTC date time or None when nothing if found"""
-        msg = self._read_message(messagetype='RMC', debug=debug)
+        msg = self._read_fields(('RMC',), debug=debug)
         if msg is not None:
-            utc_time = msg['UTCTime']
-            utc_date = msg['Date']
+            utc_time, latitude, longitude, mode, speed, COG, utc_date = msg
             if str(utc_date)[-2:] == '80':
                 return None
             return "20{}-{}-{}T{}:{}:{}+00:00".format(utc_date[4:6], utc_date[2:4], utc_date[0:2],
@@ -391,10 +763,9 @@ class L76GNSS:
 
     def getUTCDateTimeTuple(self, debug=False):
         """return UTC date time or None when nothing if found"""
-        msg = self._read_message(messagetype='RMC', debug=debug)
+        msg = self._read_fields(('RMC',), debug=debug)
         if msg is not None:
-            utc_time = msg['UTCTime']
-            utc_date = msg['Date']
+            utc_time, latitude, longitude, mode, speed, COG, utc_date = msg
             if debug:
                 print('utc_date type: %s' % type(utc_date))
             if str(utc_date)[-2:] == '80':
@@ -411,6 +782,7 @@ class L76GNSS:
             tries -= 1
             if debug:
                 print("*"*20,tries,"*"*20)
+            self._flush()
             self._send_message(message=message, checksum=checksum, debug=debug)
             pmtk_answer = self._read_message(messagetype=returnmessage, timeout=timeout, debug=debug)
             if pmtk_answer is not None:
@@ -434,8 +806,14 @@ class L76GNSS:
         self.ChipVersionID = version['ChipVersionID']
         if int(version['ChipVersionID'][6:8]) > 1:
             self.NMEAVersion = 410
+            self._kw_rmc = _RMC_KW_410
+            self._kw_gsa = _GSA_KW_410
+            self._kw_gsv = _GSV_KW_410
         else:
             self.NMEAVersion = 301
+            self._kw_rmc = _RMC_KW
+            self._kw_gsa = _GSA_KW
+            self._kw_gsv = _GSV_KW
         return version
 
     def get_dt_release(self, debug=False):
@@ -465,34 +843,34 @@ class L76GNSS:
 
     def enterStandBy(self, debug=False):
         """ standby mode, needs powercycle to restart"""
-        message = bytearray('$PMTK161,0*28\r\n')
-        self.i2c.writeto(GPS_I2CADDR, message)
+        self.i2c.writeto(GPS_I2CADDR, _PMTK_STANDBY)
+        self._last.clear()
 
     def hotStart(self, debug=False):
         """ HotStart the receiver, using data in nv store"""
-        message = bytearray('$PMTK101*32\r\n')
-        self.i2c.writeto(GPS_I2CADDR, message)
+        self.i2c.writeto(GPS_I2CADDR, _PMTK_HOT)
+        self._last.clear()
         self.fix = False
         # return self._read_message(messagetype='001', debug=debug)
 
     def warmStart(self, debug=False):
         """ warmStart the receiver, not using data in nv store, using last know messages"""
-        message = bytearray('$PMTK102*31\r\n')
-        self.i2c.writeto(GPS_I2CADDR, message)
+        self.i2c.writeto(GPS_I2CADDR, _PMTK_WARM)
+        self._last.clear()
         self.fix = False
         # return self._read_message(messagetype='001', debug=debug)
 
     def coldStart(self, debug=False):
         """ coldStart the receiver, not using any data """
-        message = bytearray('$PMTK103*30\r\n')
-        self.i2c.writeto(GPS_I2CADDR, message)
+        self.i2c.writeto(GPS_I2CADDR, _PMTK_COLD)
+        self._last.clear()
         self.fix = False
         # return self._read_message(messagetype='001', debug=debug)
 
     def fullColdStart(self, debug=False):
         """ full cold start the receiver, as cold start as in powercycle"""
-        message = bytearray('$PMTK104*37\r\n')
-        self.i2c.writeto(GPS_I2CADDR, message)
+        self.i2c.writeto(GPS_I2CADDR, _PMTK_FULLCOLD)
+        self._last.clear()
         self.fix = False
         # return self._read_message(messagetype='001', debug=debug)
 
@@ -526,9 +904,7 @@ class L76GNSS:
 
     def setAlwaysLocateMode(self, mode=8, debug=False):
         if mode in (8, 9):
-            message = 'PMTK225,{}'.format(mode)
-            checksum = self._get_checksum(message)
-            message = bytearray('${}*{}\r\n'.format(message, checksum))
+            message = _PMTK_ALWAYS_LOCATE[mode]
             if debug:
                 print("setAlwaysLocateMode",message)
             self.i2c.writeto(GPS_I2CADDR, message)
@@ -543,13 +919,24 @@ class L76GNSS:
 
     def _get_checksum(self, message):
         """calculates the checksum"""
-        mc = ord(message[0])
-        for m in message[1:]:
-            mc = mc ^ ord(m)
-        return '{:02x}'.format(mc).upper()
+        if isinstance(message, str):
+            message = message.encode()
+        return '{:02X}'.format(_nmea_xor(message, 0, len(message)))
 
     def _check_checksum(self, message):
         """check the checksum of the message"""
-        message = message[1:]
-        message, checksum = message.split('*')
-        return self._get_checksum(message) == checksum
+        if isinstance(message, str):
+            message = message.encode()
+        star = message.find(b'*')
+        if star < 0 or star + 3 > len(message):
+            return False
+        return _nmea_xor(message, 1, star) == _hex(message, star + 1)
+
+    # sentence id -> decoder, the PMTK and PQ messages by their full id,
+    # the talker sentences by the last three letters (GP, GL, GN, ... dropped)
+    _EXACT = {
+        'PMTK705': _pmtk_dt_release, 'PMTKLOG': _pmtk,
+        'PMTK001': _pmtkAck, 'PQVERNO': _pqverno}
+    _HANDLERS = {
+        'RMC': _RMC, 'VTG': _VTG, 'GGA': _GGA,
+        'GSA': _GSA, 'GSV': _GSV, 'GLL': _GLL}
@@ -0,0 +1,156 @@
+# host side companion of L76GNSV4 for CPython
+# replays captured NMEA logs of the L76 (trips recorded to a file, ...)
+# uses numba to compile the byte scanning when numba and numpy are
+# installed, falls back to plain python when they are not
+# MIT licence
+
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+
+    def njit(*args, **kwargs):
+        """no numba, leave the functions as they are"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+
+@njit(cache=True)
+def scan_sentence(buf, start, end):
+    """(start, star) of the first $...*hh sentence in buf[start:end], (-1, -1) if none"""
+    i = start
+    while i < end and buf[i] != 0x24:  # $
+        i += 1
+    if i >= end:
+        return -1, -1
+    j = i + 1
+    while j < end and buf[j] != 0x2A:  # *
+        if buf[j] == 0x24:
+            # the sentence before was cut short, start over
+            i = j
+        j += 1
+    if j + 3 > end:
+        return i, -1
+    return i, j
+
+
+@njit(cache=True)
+def checksum(buf, start, star):
+    """xor of the bytes between the $ at start and the * at star"""
+    cs = 0
+    for i in range(start + 1, star):
+        cs ^= buf[i]
+    return cs
+
+
+@njit(cache=True)
+def get_hex(buf, i):
+    """the two hex digits at buf[i] as an int, -1 if they aren't hex"""
+    value = 0
+    for k in range(i, i + 2):
+        c = buf[k]
+        if 0x30 <= c <= 0x39:
+            value = value * 16 + c - 0x30
+        elif 0x41 <= c <= 0x46:
+            value = value * 16 + c - 0x37
+        elif 0x61 <= c <= 0x66:
+            value = value * 16 + c - 0x57
+        else:
+            return -1
+    return value
+
+
+@njit(cache=True)
+def get_field(buf, start, end, index):
+    """(a, b) so that buf[a:b] is field index of the sentence in buf[start:end]"""
+    a = start + 1
+    for i in range(index):
+        while a < end and buf[a] != 0x2C:  # ,
+            a += 1
+        a += 1
+    if a > end:
+        return end, end
+    b = a
+    while b < end and buf[b] != 0x2C:
+        b += 1
+    return a, b
+
+
+@njit(cache=True)
+def get_float(buf, a, b):
+    """the decimal number in buf[a:b], nan when empty"""
+    if a >= b:
+        return float('nan')
+    sign = 1.0
+    if buf[a] == 0x2D:  # -
+        sign = -1.0
+        a += 1
+    value = 0.0
+    scale = 0.0
+    for i in range(a, b):
+        c = buf[i]
+        if c == 0x2E:  # .
+            scale = 1.0
+        else:
+            value = value * 10 + c - 0x30
+            scale *= 10
+    if scale > 0:
+        value /= scale
+    return sign * value
+
+
+@njit(cache=True)
+def get_latlon(buf, a, b, hemisphere):
+    """the ddmm.mmmm in buf[a:b] as degrees, negative for S and W, nan when empty"""
+    c = get_float(buf, a, b)
+    degrees = c // 100
+    c = degrees + (c - degrees * 100) / 60
+    if hemisphere == 0x53 or hemisphere == 0x57:  # S or W
+        c = -c
+    return c
+
+
+@njit(cache=True)
+def parse_gga(buf, start, end):
+    """(Latitude, Longitude, HDOP, Altitude) of the GGA sentence in buf[start:end]"""
+    a, b = get_field(buf, start, end, 2)
+    ns = buf[b + 1] if b + 1 < end else 0
+    lat = get_latlon(buf, a, b, ns)
+    a, b = get_field(buf, start, end, 4)
+    ew = buf[b + 1] if b + 1 < end else 0
+    lon = get_latlon(buf, a, b, ew)
+    a, b = get_field(buf, start, end, 8)
+    hdop = get_float(buf, a, b)
+    a, b = get_field(buf, start, end, 9)
+    alt = get_float(buf, a, b)
+    return lat, lon, hdop, alt
+
+
+def _as_buffer(data):
+    """the bytes in the form the (compiled) functions above take"""
+    if np is not None:
+        return np.frombuffer(bytes(data), dtype=np.uint8)
+    return bytes(data)
+
+
+def parse_stream(chunks):
+    """yields (Latitude, Longitude, HDOP, Altitude) for every valid GGA sentence
+    in chunks, an iterable of bytes like a file opened in binary mode"""
+    pending = b""
+    for chunk in chunks:
+        data = pending + chunk
+        buf = _as_buffer(data)
+        end = len(buf)
+        pos = 0
+        while True:
+            start, star = scan_sentence(buf, pos, end)
+            if star < 0:
+                break
+            pos = star + 3
+            if checksum(buf, start, star) != get_hex(buf, star + 1):
+                continue
+            if buf[start + 3] == 0x47 and buf[start + 4] == 0x47 and buf[start + 5] == 0x41:  # GGA
+                yield parse_gga(buf, start, star)
+        pending = data[start:] if start >= 0 else b""